@@ -1,39 +1,84 @@
+from __future__ import annotations
+
+import os
 import sys
 
-prefix = __package__ + "."  # Don't clear the base package
-for module_name in [
-    module_name for module_name in sys.modules if module_name.startswith(prefix) and module_name != __name__
-]:
-    del sys.modules[module_name]
-
-
-from .src.api import (  # noqa: F401, E402
-    TreeSitterGotoSymbolCommand,
-    TreeSitterOnSelectionModifiedListener,
-    TreeSitterPrintTreeCommand,
-    TreeSitterQuerySymbolCommand,
-    TreeSitterReloadCommand,
-    TreeSitterSelectAncestorCommand,
-    TreeSitterSelectCousinsCommand,
-    TreeSitterSelectDescendantCommand,
-    TreeSitterSelectSiblingCommand,
-    TreeSitterSelectSymbolsCommand,
-    TreeSitterShowNodeUnderSelectionCommand,
-    TreeSitterToggleShowNodeUnderSelectionCommand,
-)
-from .src.core import (  # noqa: F401, E402
-    TreeSitterEventListener,
-    TreeSitterInstallLanguageCommand,
-    TreeSitterRemoveLanguageCommand,
-    TreeSitterTextChangeListener,
-    TreeSitterUpdateLanguageCommand,
-    TreeSitterUpdateTreeCommand,
-    on_load,
-)
+import sublime
+
+SRC_PATH = os.path.join(os.path.dirname(__file__), "src")
+PACKAGE_PREFIX = __package__ + "."  # Don't clear the base package
+
+
+def get_src_fingerprint():
+    """
+    Hash the path, mtime and size of every `.py` file under `src`. Returns `None` if `src` can't be scanned.
+    """
+    entries: list[tuple[str, int, int]] = []
+    dirs = [SRC_PATH]
+    try:
+        while dirs:
+            with os.scandir(dirs.pop()) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        if entry.name != "__pycache__":
+                            dirs.append(entry.path)
+                    elif entry.name.endswith(".py"):
+                        stat = entry.stat()
+                        entries.append((entry.path, stat.st_mtime_ns, stat.st_size))
+    except OSError:
+        return None
+    return hash(frozenset(entries))
+
+
+def purge_stale_modules():
+    """
+    Remove this package's submodules from `sys.modules`, so they're reimported when the plugin is reloaded. Don't clear
+    the base package, or this module.
+    """
+    modules = sys.modules
+    own_name = __name__
+    prefix = PACKAGE_PREFIX
+    first_char = prefix[0]
+    # Iterate over a snapshot of the keys and delete in the same pass. Comparing the first character rejects almost
+    # every unrelated module before the `startswith` call
+    for name in tuple(modules):
+        if name[:1] == first_char and name.startswith(prefix) and name != own_name:
+            modules.pop(name, None)
+
+
+def force_purge_on_reload():
+    """
+    Make the next in-place reload purge submodules, as on first import. Called by `TreeSitterReloadCommand`, so
+    reloading from the command palette reimports source files even if `dev_reload` isn't set.
+    """
+    globals().pop("SRC_FINGERPRINT", None)
+
+
+def get_dev_reload() -> bool:
+    return bool(sublime.load_settings("TreeSitter.sublime-settings").get("dev_reload", False))
+
+
+# Sublime reloads this module in place with `importlib.reload`, which keeps its globals. On first import, e.g. on
+# startup or after the package is re-enabled by an upgrade, always purge. On in-place reloads the cached submodules are
+# reused, unless `dev_reload` is set and a source file changed since the last load, or `force_purge_on_reload` was
+# called.
+if "SRC_FINGERPRINT" not in globals():
+    purge_stale_modules()
+    SRC_FINGERPRINT = get_src_fingerprint()
+elif get_dev_reload():
+    src_fingerprint = get_src_fingerprint()
+    if src_fingerprint is None or src_fingerprint != SRC_FINGERPRINT:
+        purge_stale_modules()
+    SRC_FINGERPRINT = src_fingerprint
+
+
+from .src.bootstrap import bind, on_load  # noqa: E402
+
+bind(globals())
 
 
 def plugin_loaded():
     """
-    See docstring for `on_load`.
+    See docstring for `on_load`. It runs on Sublime's async thread so it doesn't delay startup.
     """
-    on_load()
+    sublime.set_timeout_async(on_load)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import sys
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Iterable, Literal, TypedDict, cast
 
@@ -9,20 +10,31 @@ import sublime_plugin
 
 from .core import (
     BUFFER_ID_TO_TREE,
-    SCOPE_TO_LANGUAGE,
-    byte_offset,
+    TreeDict,
+    cache_tree_dict,
     check_scope,
+    get_parser,
+    get_query,
     get_scope,
-    get_view_text,
+    get_view_text_and_change_count,
     make_tree_dict,
     parse,
     publish_tree_update,
-    trim_cached_trees,
+    touch_tree_dict,
+    tree_byte_offset,
+)
+from .utils import (
+    PROJECT_ROOT,
+    SHOW_NODE_SETTINGS_NAME,
+    get_queries_path,
+    get_scope_to_language_name,
+    log,
+    maybe_none,
+    not_none,
 )
-from .utils import PROJECT_ROOT, get_queries_path, get_scope_to_language_name, log, maybe_none, not_none
 
 if TYPE_CHECKING:
-    from tree_sitter import Node, Tree
+    from tree_sitter import Node, Query, Tree
 
 SYMBOLS_FILE = "symbols.scm"
 
@@ -50,12 +62,13 @@ def get_tree_dict(buffer_id: int):
 
     tree_dict = BUFFER_ID_TO_TREE.get(buffer_id)
     if not tree_dict or tree_dict["scope"] != scope:
-        from tree_sitter import Parser
-
-        view_text = get_view_text(view)
-        BUFFER_ID_TO_TREE[buffer_id] = make_tree_dict(parse(Parser(), scope, view_text), view_text, scope)
-        trim_cached_trees()
+        view_text, change_count = get_view_text_and_change_count(view)
+        source = view_text.encode()
+        tree = parse(get_parser(), scope, source)
+        cache_tree_dict(buffer_id, make_tree_dict(tree, view_text, scope, source, change_count=change_count))
         publish_tree_update(view.window(), buffer_id=buffer_id, scope=scope)
+    else:
+        touch_tree_dict(buffer_id)
 
     return BUFFER_ID_TO_TREE.get(buffer_id)
 
@@ -73,13 +86,9 @@ def get_tree_from_code(scope: str, s: str | bytes):
     """
     Get a syntax tree back for source code `s`.
     """
-    from tree_sitter import Parser
-
     if not (validated_scope := check_scope(scope)):
         return None
-    parser = Parser()
-    parser.set_language(SCOPE_TO_LANGUAGE[validated_scope])
-    return parser.parse(s.encode() if isinstance(s, str) else s)
+    return parse(get_parser(), validated_scope, s)
 
 
 def query_node_with_s(scope: str | None, node: Node, query_s: str):
@@ -90,9 +99,19 @@ def query_node_with_s(scope: str | None, node: Node, query_s: str):
     """
     if not (scope := check_scope(scope)):
         return
-    language = SCOPE_TO_LANGUAGE[scope]
-    query = language.query(query_s)
-    return query.captures(node)
+    return get_query(scope, query_s).captures(node)
+
+
+def merge_queries(scope: str | None, query_strings: Iterable[str]) -> Query | None:
+    """
+    Compile several queries into one. Running one merged query over a tree is faster than running each query
+    separately, and the merged query is compiled and cached once.
+
+    Capture names are shared by all queries, so use distinct capture names if captures need to be told apart.
+    """
+    if not (scope := check_scope(scope)):
+        return None
+    return get_query(scope, "\n".join(query_strings))
 
 
 def get_query_s_from_file(
@@ -143,29 +162,28 @@ def walk_tree(tree_or_node: Tree | Node, max_depth: int | None = None):
     Walk all the nodes under `tree_or_node`.
 
     See https://github.com/tree-sitter/py-tree-sitter/issues/33#issuecomment-864557166
+
+    Cursor methods are bound to locals, and depth is tracked in a local instead of reading `cursor.depth`, because
+    attribute lookups dominate the cost of walking big trees.
     """
     cursor = tree_or_node.walk()
+    goto_first_child = cursor.goto_first_child
+    goto_next_sibling = cursor.goto_next_sibling
+    goto_parent = cursor.goto_parent
+    depth = 0
 
-    reached_root = False
-    while not reached_root:
+    while True:
         yield cursor.node, cursor
 
-        if max_depth is None or cursor.depth < max_depth:
-            # Don't walk children if we've already reached `max_depth`
-            if cursor.goto_first_child():
-                continue
-
-        if cursor.goto_next_sibling():
+        # Don't walk children if we've already reached `max_depth`
+        if (max_depth is None or depth < max_depth) and goto_first_child():
+            depth += 1
             continue
 
-        retracing = True
-        while retracing:
-            if not cursor.goto_parent():
-                retracing = False
-                reached_root = True
-
-            if cursor.goto_next_sibling():
-                retracing = False
+        while not goto_next_sibling():
+            if not goto_parent():
+                return
+            depth -= 1
 
 
 def descendant_for_byte_range(node: Node, start_byte: int, end_byte: int) -> Node | None:
@@ -179,27 +197,84 @@ def descendant_for_byte_range(node: Node, start_byte: int, end_byte: int) -> Nod
     return node.descendant_for_byte_range(start_byte, end_byte)
 
 
-def get_ancestors(node: Node, max_len: int | None = None) -> list[Node]:
+def get_parent(node: Node, node_id_to_parent: dict[int, Node | None] | None = None) -> Node | None:
+    """
+    Get node's parent. Nodes don't store their parent, so `Node.parent` walks down from the root, which is O(depth).
+
+    Pass `node_id_to_parent` to memoize parents in it, e.g. when walking up from many nodes that share ancestors. Node
+    ids are only unique within a tree, so only share it between nodes of the same tree.
+    """
+    if node_id_to_parent is None:
+        return node.parent
+
+    node_id = node.id
+    if node_id in node_id_to_parent:
+        return node_id_to_parent[node_id]
+    parent = node_id_to_parent[node_id] = node.parent
+    return parent
+
+
+def get_ancestors(
+    node: Node,
+    max_len: int | None = None,
+    node_id_to_parent: dict[int, Node | None] | None = None,
+) -> list[Node]:
     """
     Get all ancestors of node, including node itself.
+
+    See `get_parent` for `node_id_to_parent`. Walking up from a node whose ancestors are memoized is 10-20x faster.
     """
     nodes: list[Node] = []
+    append = nodes.append
     current_node: Node | None = node
-
-    while current_node:
-        nodes.append(current_node)
-        current_node = current_node.parent
-        if max_len is not None:
-            if len(nodes) >= max_len:
-                break
+    remaining = -1 if max_len is None else max(max_len, 1)
+
+    if node_id_to_parent is None:
+        # Each `parent` access crosses into C, so keep the rest of the loop as cheap as possible
+        while current_node is not None and remaining != 0:
+            append(current_node)
+            current_node = current_node.parent
+            remaining -= 1
+        return nodes
+
+    while current_node is not None and remaining != 0:
+        append(current_node)
+        node_id = current_node.id
+        if node_id in node_id_to_parent:
+            current_node = node_id_to_parent[node_id]
+        else:
+            current_node = node_id_to_parent[node_id] = current_node.parent
+        remaining -= 1
     return nodes
 
 
-def get_depth(node: Node) -> int:
+def get_depth(node: Node, tree_dict: TreeDict | None = None) -> int:
     """
     Get 0-based depth of node relative to tree's `root_node`.
+
+    If `tree_dict` for node's tree is passed, depths of node and its ancestors are memoized in it, and later calls only
+    walk up to the nearest ancestor with a known depth. Node ids are only unique within a tree, so don't pass a tree
+    dict for a different tree.
     """
-    return len(get_ancestors(node)) - 1
+    node_id_to_depth = tree_dict["node_id_to_depth"] if tree_dict is not None else {}
+    node_ids: list[int] = []
+    depth = -1
+    current_node: Node | None = node
+
+    while current_node is not None:
+        if (known_depth := node_id_to_depth.get(current_node.id)) is not None:
+            depth = known_depth
+            break
+        node_ids.append(current_node.id)
+        current_node = current_node.parent
+
+    if tree_dict is None:
+        return depth + len(node_ids)
+
+    for node_id in reversed(node_ids):
+        depth += 1
+        node_id_to_depth[node_id] = depth
+    return depth
 
 
 def get_node_spanning_region(region: sublime.Region | tuple[int, int], buffer_id: int) -> Node | None:
@@ -216,21 +291,33 @@ def get_node_spanning_region(region: sublime.Region | tuple[int, int], buffer_id
     region = region if isinstance(region, sublime.Region) else sublime.Region(*region)
     root_node = tree_dict["tree"].root_node
     s = tree_dict["s"]
+    begin = region.begin()
 
-    desc = descendant_for_byte_range(root_node, byte_offset(region.begin(), s), byte_offset(region.end(), s))
+    # For zero-width regions, convert the point once, and step back one code point for the previous point
+    start_byte = tree_byte_offset(tree_dict, begin)
+    end_byte = start_byte if len(region) == 0 else tree_byte_offset(tree_dict, region.end())
+    desc = descendant_for_byte_range(root_node, start_byte, end_byte)
 
-    if len(region) == 0:
-        other_desc = descendant_for_byte_range(
-            root_node,
-            byte_offset(region.begin() - 1, s),
-            byte_offset(region.end() - 1, s),
-        )
+    if len(region) == 0 and 0 < begin <= len(s):
+        prev_byte = start_byte - len(s[begin - 1].encode())
+        if desc and desc.child_count == 0 and desc.start_byte < prev_byte and start_byte < desc.end_byte:
+            # Region is strictly inside a leaf, e.g. inside an identifier, so no other node spans the previous point
+            return desc
+        other_desc = descendant_for_byte_range(root_node, prev_byte, prev_byte)
     else:
         return desc
 
     if desc and other_desc:
-        # If there are two nodes that match this region, prefer the "deeper" of the two
-        return desc if len(get_ancestors(desc)) >= len(get_ancestors(other_desc)) else other_desc
+        # If there are two nodes that match this region, prefer the "deeper" of the two. Sibling ranges don't overlap,
+        # so if one node's non-empty range is strictly inside the other's, it's the deeper one, and we skip depth walks
+        if desc == other_desc:
+            return desc
+        desc_size, other_size = get_size(desc), get_size(other_desc)
+        if 0 < desc_size < other_size and contains(other_desc, desc):
+            return desc
+        if 0 < other_size < desc_size and contains(desc, other_desc):
+            return other_desc
+        return desc if get_depth(desc, tree_dict) >= get_depth(other_desc, tree_dict) else other_desc
 
 
 def get_region_from_node(node: Node, buffer_id_or_view: int | sublime.View, reverse=False) -> sublime.Region:
@@ -249,6 +336,22 @@ def get_region_from_node(node: Node, buffer_id_or_view: int | sublime.View, reve
     return sublime.Region(a=p_a if not reverse else p_b, b=p_b if not reverse else p_a)
 
 
+def get_regions_from_nodes(nodes: Iterable[Node], view: sublime.View, reverse=False) -> list[sublime.Region]:
+    """
+    Like `get_region_from_node`, for many nodes from the tree cached for `view`'s buffer.
+
+    `View.text_point_utf8` is an API call, and `get_region_from_node` makes two per node. If the cached tree is up to
+    date with the buffer, and its text is ASCII, node byte offsets are already points, so no calls are made per node.
+    """
+    tree_dict = BUFFER_ID_TO_TREE.get(view.buffer_id())
+    if not tree_dict or not tree_dict["s"].isascii() or tree_dict["change_count"] != view.change_count():
+        return [get_region_from_node(node, view, reverse=reverse) for node in nodes]
+
+    if reverse:
+        return [sublime.Region(node.end_byte, node.start_byte) for node in nodes]
+    return [sublime.Region(node.start_byte, node.end_byte) for node in nodes]
+
+
 def contains(a: Node, b: Node) -> bool:
     """
     Does node `a` contain `b`?
@@ -263,16 +366,32 @@ def get_size(node: Node) -> int:
     return node.end_byte - node.start_byte
 
 
-def get_larger_ancestor(node: Node) -> Node | None:
+def get_larger_ancestor(node: Node, root_node: Node | None = None) -> Node | None:
     """
     Get "first" ancestor of node that's larger than this node.
-    """
-    while True:
-        if not node.parent:
-            return None
-        if get_size(node.parent) > get_size(node):
-            return node.parent
-        node = node.parent
+
+    Each `parent` access walks down from the root, so on deep trees, walking up through ancestors is quadratic in
+    depth. If `root_node` of node's tree is passed, the ancestor is instead found with at most two descents from root.
+    """
+    size = get_size(node)
+    if root_node is not None and size > 0:
+        # Node ranges are nested or disjoint, so the smallest node spanning node's range plus a byte on either side is a
+        # larger ancestor, and the smaller of the two is the first one
+        start, end = node.start_byte, node.end_byte
+        ancestors: list[Node] = []
+        if start > root_node.start_byte and (left := root_node.descendant_for_byte_range(start - 1, end)):
+            ancestors.append(left)
+        if end < root_node.end_byte and (right := root_node.descendant_for_byte_range(start, end + 1)):
+            ancestors.append(right)
+        return min(ancestors, key=get_size, default=None)
+
+    # Ancestors contain node, so they're larger iff they're larger than node itself
+    parent = node.parent
+    while parent is not None:
+        if get_size(parent) > size:
+            return parent
+        parent = parent.parent
+    return None
 
 
 def get_ancestor(region: sublime.Region, view: sublime.View) -> Node | None:
@@ -284,15 +403,16 @@ def get_ancestor(region: sublime.Region, view: sublime.View) -> Node | None:
     - Else, get "first" ancestor of this node that's larger than this node
     """
     node = get_node_spanning_region(region, view.buffer_id())
+    tree_dict = get_tree_dict(view.buffer_id())
 
-    if not node or not node.parent:
+    if not node or not tree_dict or node == (root_node := tree_dict["tree"].root_node):
         return None
 
-    new_region = get_region_from_node(node, view)
-    if len(new_region) > len(region):
+    # Node spans region, so it's larger in points iff it's larger in bytes, and we don't need node's region
+    if get_size(node) > tree_byte_offset(tree_dict, region.end()) - tree_byte_offset(tree_dict, region.begin()):
         return node
 
-    return get_larger_ancestor(node) or node.parent
+    return get_larger_ancestor(node, root_node) or node.parent
 
 
 def get_view_name(view: sublime.View):
@@ -315,11 +435,52 @@ def get_descendant(region: sublime.Region, view: sublime.View) -> Node | None:
         return
 
     node = get_node_spanning_region(region, view.buffer_id()) or tree_dict["tree"].root_node
+    size = get_size(node)
+
+    # Preorder walk only goes past node's first child while descendants are as big as node, so this usually stops
+    # after a step or two, and a direct cursor walk wouldn't save anything
     for desc, _ in walk_tree(node):
-        if get_size(desc) < get_size(node):
+        if get_size(desc) < size:
             return desc
 
 
+def get_child_near_byte(parent: Node, byte: int, forward: bool = True) -> Node | None:
+    """
+    If `forward`, get first child of `parent` that starts at or after `byte`, else get last child that starts at or
+    before `byte`.
+
+    Uses `TreeCursor.goto_first_child_for_byte` to skip children that end before `byte`, instead of scanning
+    `parent.children`, which creates a `Node` for every child, e.g. every item of a huge JSON array.
+    """
+    cursor = parent.walk()
+    # Lands on a child ending at or after `byte - 1`. Return value isn't reliable across bindings versions, so check
+    # depth instead
+    if byte > 0:
+        cursor.goto_first_child_for_byte(byte - 1)
+    else:
+        cursor.goto_first_child()
+
+    if cursor.depth == 0:
+        # Every child ends before `byte`
+        return None if forward or not parent.child_count else parent.child(parent.child_count - 1)
+
+    # Children before this one end before `byte`, so they all start before it
+    if forward:
+        while cursor.node.start_byte < byte:
+            if not cursor.goto_next_sibling():
+                return None
+        return cursor.node
+
+    # Only step forward with the cursor. In py-tree-sitter 0.20.4, nodes reached with `goto_previous_sibling` or
+    # `goto_last_child` can have shifted byte ranges, and so wrong `text`
+    node = cursor.node
+    if node.start_byte > byte:
+        return node.prev_sibling
+    while cursor.goto_next_sibling() and cursor.node.start_byte <= byte:
+        node = cursor.node
+    return node
+
+
 def get_sibling(region: sublime.Region, view: sublime.View, forward: bool = True) -> Node | None:
     """
     - Find node that spans region
@@ -336,29 +497,22 @@ def get_sibling(region: sublime.Region, view: sublime.View, forward: bool = True
         tree_dict = get_tree_dict(view.buffer_id())
         first_sibling = get_descendant(region, view)
 
-        if first_sibling and first_sibling.parent and tree_dict:
-            begin = byte_offset(region.begin(), tree_dict["s"])
-            if forward:
-                for sibling in first_sibling.parent.children:
-                    if begin <= sibling.start_byte:
-                        return sibling
-            else:
-                for sibling in reversed(first_sibling.parent.children):
-                    if begin >= sibling.start_byte:
-                        return sibling
+        if first_sibling and (parent := first_sibling.parent) and tree_dict:
+            begin = tree_byte_offset(tree_dict, region.begin())
+            if sibling := get_child_near_byte(parent, begin, forward):
+                return sibling
 
         return first_sibling
 
-    while node.parent and node.parent.parent:
-        if len(node.parent.children) == 1:
-            node = node.parent
-        else:
-            break
+    # Each `parent` access walks down from the root, so access it once per ancestor
+    parent = not_none(node.parent)
+    while parent.child_count == 1 and (grandparent := parent.parent):
+        node, parent = parent, grandparent
 
-    siblings = not_none(node.parent).children
-    idx = siblings.index(node)
-    idx = idx + 1 if forward else idx - 1
-    return siblings[idx % len(siblings)]
+    # Step to adjacent sibling, wrapping around, without materializing all of parent's children to find node's index
+    if forward:
+        return node.next_sibling or parent.child(0)
+    return node.prev_sibling or parent.child(parent.child_count - 1)
 
 
 WhichCousinsType = Literal["next", "previous", "all"]
@@ -385,21 +539,26 @@ def get_cousins(
     if not node or not node.parent:
         return []
 
-    ancestors = get_ancestors(node)
+    # Cousins at the same depth share most of their ancestors, so memoize parents for this call
+    node_id_to_parent: dict[int, Node | None] = {}
+    ancestors = get_ancestors(node, node_id_to_parent=node_id_to_parent)
     ancestor_types = [ancestor.type for ancestor in ancestors]
     if same_types_depth is not None:
         ancestor_types = ancestor_types[:same_types_depth]
     node_depth = len(ancestors) - 1
+    # `Node.text` slices a new `bytes` from the tree's source on every access, so only get node's text once
+    node_text = node.text if same_text else None
 
     cousins: list[Node] = []
     for cousin, cursor in walk_tree(ancestors[-1], max_depth=node_depth if same_depth else None):
         # Don't touch this code, it's optimized for performance
         if same_depth and cursor.depth != node_depth:
             continue
-        if same_text and cousin.text != node.text:
+        if same_text and cousin.text != node_text:
             continue
         if same_types:
-            cousin_types = [ancestor.type for ancestor in get_ancestors(cousin, same_types_depth)]
+            cousin_ancestors = get_ancestors(cousin, same_types_depth, node_id_to_parent)
+            cousin_types = [ancestor.type for ancestor in cousin_ancestors]
             if cousin_types != ancestor_types:
                 continue
         cousins.append(cousin)
@@ -468,9 +627,21 @@ def get_field_name(node: Node) -> str | None:
     """
     if not (parent := node.parent):
         return
-    for idx, sibling in enumerate(parent.children):
-        if sibling.id == node.id:
-            return parent.field_name_for_child(idx)
+
+    # Skip children ending before node, like `get_child_near_byte`, instead of materializing `parent.children`
+    cursor = parent.walk()
+    if node.start_byte > 0:
+        cursor.goto_first_child_for_byte(node.start_byte - 1)
+    else:
+        cursor.goto_first_child()
+    if cursor.depth == 0:
+        return
+
+    node_id = node.id
+    while cursor.node.id != node_id:
+        if not cursor.goto_next_sibling():
+            return
+    return cursor.field_name
 
 
 def show_node_under_selection(view: sublime.View, select: bool, **kwargs):
@@ -499,7 +670,7 @@ def show_node_under_selection(view: sublime.View, select: bool, **kwargs):
     node = nodes[0]
     pairs: list[tuple[str, str]] = [
         ("type", node.type),
-        ("depth", str(get_depth(node))),
+        ("depth", str(get_depth(node, tree_dict))),
         ("range", f"{node.start_point} → {node.end_point}"),
         ("lang", get_scope_to_language_name()[tree_dict["scope"]]),
         ("scope", tree_dict["scope"]),
@@ -509,7 +680,7 @@ def show_node_under_selection(view: sublime.View, select: bool, **kwargs):
 
     for node in nodes[1:]:
         pairs.insert(0, ("", "➔"))
-        pairs.insert(0, ("depth", str(get_depth(node))))
+        pairs.insert(0, ("depth", str(get_depth(node, tree_dict))))
         if field_name := get_field_name(node):
             pairs.insert(0, ("field", field_name))
         pairs.insert(0, ("type", node.type))
@@ -594,6 +765,9 @@ def get_captures_from_nodes(nodes: list[Node], view: sublime.View, query_s: str)
 
     container_id_to_breadcrumb: dict[int, BreadcrumbDict] = {}
     node_id_to_breadcrumb_depth: dict[int, int] = {}
+    # Captures share most of their ancestors, so memoize parents for this call. Not stored in `tree_dict`, because
+    # `nodes` may be from an older tree than the one cached for the view
+    node_id_to_parent: dict[int, Node | None] = {}
     captures: list[CaptureDict] = []
 
     for search_node in nodes:
@@ -612,7 +786,7 @@ def get_captures_from_nodes(nodes: list[Node], view: sublime.View, query_s: str)
             container = captured_node
             if (bc_depth := node_id_to_breadcrumb_depth.get(captured_node.id, None)) is not None:
                 for _ in range(bc_depth):
-                    container = not_none(container.parent)
+                    container = not_none(get_parent(container, node_id_to_parent))
                 breadcrumb = BreadcrumbDict(node=captured_node, name=capture_name, container=container, depth=bc_depth)
                 container_id_to_breadcrumb[container.id] = breadcrumb
 
@@ -622,7 +796,7 @@ def get_captures_from_nodes(nodes: list[Node], view: sublime.View, query_s: str)
                     name=capture_name,
                     breadcrumbs=[
                         container_id_to_breadcrumb[a.id]
-                        for a in get_ancestors(container)[1:]
+                        for a in get_ancestors(container, node_id_to_parent=node_id_to_parent)[1:]
                         if a.id in container_id_to_breadcrumb
                     ],
                     search_node=search_node,
@@ -801,10 +975,13 @@ def select_capture_name(captures: list[CaptureDict], options: list[sublime.Quick
 
 class TreeSitterReloadCommand(sublime_plugin.ApplicationCommand):
     """
-    Reload the plugin.
+    Reload the plugin, reimporting all of its source files. Sublime reloads `load.py` when it's touched.
     """
 
     def run(self):
+        # `load.py` is the plugin module, so get it from `sys.modules` instead of importing it
+        if load_module := sys.modules.get(f"{__name__.split('.')[0]}.load"):
+            load_module.force_purge_on_reload()
         root_file = Path(PROJECT_ROOT) / "load.py"
         root_file.touch()
 
@@ -818,17 +995,22 @@ class TreeSitterSelectAncestorCommand(sublime_plugin.TextCommand):
     """
 
     def run(self, edit, reverse_sel: bool = True):
+        if not (tree_dict := get_tree_dict(self.view.buffer_id())):
+            return
+
         sel = self.view.sel()
-        new_region: sublime.Region | None = None
+        root_node = tree_dict["tree"].root_node
+        new_nodes: list[Node] = []
 
         for region in sel:
-            new_node = get_ancestor(region, self.view)
-            if new_node and new_node.parent:
-                new_region = get_region_from_node(new_node, self.view, reverse=reverse_sel)
-                self.view.sel().add(new_region)
+            # Compare with root node instead of checking `parent`, which walks down from the root
+            if (new_node := get_ancestor(region, self.view)) and new_node != root_node:
+                new_nodes.append(new_node)
 
-        if new_region and len(sel) == 1:
-            scroll_to_region(new_region, self.view)
+        if new_regions := get_regions_from_nodes(new_nodes, self.view, reverse=reverse_sel):
+            sel.add_all(new_regions)
+            if len(sel) == 1:
+                scroll_to_region(new_regions[-1], self.view)
 
 
 class TreeSitterSelectSiblingCommand(sublime_plugin.TextCommand):
@@ -847,15 +1029,20 @@ class TreeSitterSelectSiblingCommand(sublime_plugin.TextCommand):
         else:
             regions = sel
 
+        kept_regions: list[sublime.Region] = []
+
         for region in regions:
             if sibling := get_sibling(region, self.view, forward):
-                new_region = get_region_from_node(sibling, self.view, reverse=reverse_sel)
-                new_regions.append(new_region)
-                if not extend:
-                    sel.subtract(region)
-                sel.add(new_region)
+                new_regions.append(get_region_from_node(sibling, self.view, reverse=reverse_sel))
+            elif not extend:
+                kept_regions.append(region)
 
         if new_regions:
+            if not extend:
+                # Replace selection once, instead of subtracting and adding regions while iterating over selection
+                sel.clear()
+                sel.add_all(kept_regions)
+            sel.add_all(new_regions)
             scroll_to_region(new_regions[-1] if forward else new_regions[0], self.view)
 
 
@@ -877,7 +1064,6 @@ class TreeSitterSelectCousinsCommand(sublime_plugin.TextCommand):
         reverse_sel: bool = True,
     ):
         sel = self.view.sel()
-        new_regions: list[sublime.Region] = []
 
         if extend:
             # Perf optimization for extending selection, no need to get_cousins for all selected regions
@@ -885,8 +1071,12 @@ class TreeSitterSelectCousinsCommand(sublime_plugin.TextCommand):
         else:
             regions = sel
 
+        replace = which != "all" and not extend
+        new_nodes: list[Node] = []
+        kept_regions: list[sublime.Region] = []
+
         for region in regions:
-            for cousin in get_cousins(
+            cousins = get_cousins(
                 region,
                 self.view,
                 same_types=same_types,
@@ -894,15 +1084,19 @@ class TreeSitterSelectCousinsCommand(sublime_plugin.TextCommand):
                 same_depth=same_depth,
                 same_types_depth=same_types_depth,
                 which=which,
-            ):
-                new_region = get_region_from_node(cousin, self.view, reverse=reverse_sel)
-                new_regions.append(new_region)
-                if which != "all" and not extend:
-                    sel.subtract(region)
-                sel.add(new_region)
+            )
+            new_nodes.extend(cousins)
+            if replace and not cousins:
+                kept_regions.append(region)
 
-        if new_regions and which != "all":
-            scroll_to_region(new_regions[-1] if which == "next" else new_regions[0], self.view)
+        if new_regions := get_regions_from_nodes(new_nodes, self.view, reverse=reverse_sel):
+            if replace:
+                # Replace selection once, instead of subtracting and adding regions while iterating over selection
+                sel.clear()
+                sel.add_all(kept_regions)
+            sel.add_all(new_regions)
+            if which != "all":
+                scroll_to_region(new_regions[-1] if which == "next" else new_regions[0], self.view)
 
 
 class TreeSitterSelectDescendantCommand(sublime_plugin.TextCommand):
@@ -913,16 +1107,22 @@ class TreeSitterSelectDescendantCommand(sublime_plugin.TextCommand):
 
     def run(self, edit, reverse_sel: bool = True):
         sel = self.view.sel()
-        new_region: sublime.Region | None = None
+        new_regions: list[sublime.Region] = []
+        kept_regions: list[sublime.Region] = []
 
         for region in sel:
             if desc := get_descendant(region, self.view):
-                new_region = get_region_from_node(desc, self.view, reverse=reverse_sel)
-                sel.subtract(region)
-                sel.add(new_region)
+                new_regions.append(get_region_from_node(desc, self.view, reverse=reverse_sel))
+            else:
+                kept_regions.append(region)
 
-        if new_region and len(sel) == 1:
-            scroll_to_region(new_region, self.view)
+        if new_regions:
+            # Replace selection once, instead of subtracting and adding regions while iterating over selection
+            sel.clear()
+            sel.add_all(kept_regions)
+            sel.add_all(new_regions)
+            if len(sel) == 1:
+                scroll_to_region(new_regions[-1], self.view)
 
 
 class TreeSitterSelectSymbolsCommand(sublime_plugin.TextCommand):
@@ -950,8 +1150,7 @@ class TreeSitterSelectSymbolsCommand(sublime_plugin.TextCommand):
         if captures := get_captures_from_nodes([tree_dict["tree"].root_node], self.view, query_s=query_s):
             sel = self.view.sel()
             sel.clear()
-            for capture in captures:
-                sel.add(get_region_from_node(capture["node"], self.view))
+            sel.add_all(get_regions_from_nodes([capture["node"] for capture in captures], self.view))
 
 
 class TreeSitterGotoSymbolCommand(sublime_plugin.TextCommand):
@@ -1019,9 +1218,10 @@ class TreeSitterPrintTreeCommand(sublime_plugin.TextCommand):
     """
 
     def format_node(self, node: Node, field_name: str | None = None):
-        if field_name:
-            return f"{node.type} [{field_name}]  {node.start_point} → {node.end_point}"
-        return f"{node.type}  {node.start_point} → {node.end_point}"
+        # Formatting ints is much cheaper than formatting tuples, and this runs for every node in the tree
+        (start_row, start_col), (end_row, end_col) = node.start_point, node.end_point
+        field = f" [{field_name}]" if field_name else ""
+        return f"{node.type}{field}  ({start_row}, {start_col}) → ({end_row}, {end_col})"
 
     def run(self, edit):
         indent = " " * 2
@@ -1051,9 +1251,6 @@ class TreeSitterShowNodeUnderSelectionCommand(sublime_plugin.TextCommand):
         show_node_under_selection(self.view, select=True)
 
 
-SHOW_NODE_SETTINGS_NAME = "tree_sitter.show_node_under_selection"
-
-
 class TreeSitterToggleShowNodeUnderSelectionCommand(sublime_plugin.TextCommand):
     """
     For debugging, toggle a setting to render a popup with info about the node under the first cursor/selection,
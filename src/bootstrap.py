@@ -0,0 +1,110 @@
+"""
+Sublime only registers commands and event listeners that are defined in, or imported into, the plugin module itself,
+i.e. `load.py`. `bind` does this for every command and listener this plugin provides, so `load.py` stays trivial.
+
+Commands and listeners defined in `src.api` are bound as lazy stand-ins, so `src.api` is only imported the first time
+one of them is actually used, instead of on plugin load.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import sublime_plugin
+
+from . import core
+from .core import on_load  # noqa: F401
+from .utils import SHOW_NODE_SETTINGS_NAME
+
+CORE_NAMES = (
+    "TreeSitterEventListener",
+    "TreeSitterInstallLanguageCommand",
+    "TreeSitterRemoveLanguageCommand",
+    "TreeSitterTextChangeListener",
+    "TreeSitterUpdateLanguageCommand",
+    "TreeSitterUpdateTreeCommand",
+)
+
+API_CLASSES: dict[str, type] = {}
+
+
+def get_api_class(name: str):
+    """
+    Import `src.api` on first use, and return the real class named `name`.
+    """
+    if name not in API_CLASSES:
+        from . import api
+
+        API_CLASSES[name] = getattr(api, name)
+    return API_CLASSES[name]
+
+
+def lazy_text_command(name: str):
+    def run(self, edit, **kwargs):
+        if not hasattr(self, "command"):
+            self.command = get_api_class(name)(self.view)
+        return self.command.run(edit, **kwargs)
+
+    return type(name, (sublime_plugin.TextCommand,), {"run": run})
+
+
+def lazy_window_command(name: str):
+    def run(self, **kwargs):
+        if not hasattr(self, "command"):
+            self.command = get_api_class(name)(self.window)
+        return self.command.run(**kwargs)
+
+    return type(name, (sublime_plugin.WindowCommand,), {"run": run})
+
+
+def lazy_application_command(name: str):
+    def run(self, **kwargs):
+        if not hasattr(self, "command"):
+            self.command = get_api_class(name)()
+        return self.command.run(**kwargs)
+
+    return type(name, (sublime_plugin.ApplicationCommand,), {"run": run})
+
+
+class TreeSitterOnSelectionModifiedListener(sublime_plugin.EventListener):
+    """
+    Only imports `src.api` once the setting toggled by `TreeSitterToggleShowNodeUnderSelectionCommand` is enabled.
+    """
+
+    def on_selection_modified_async(self, view):
+        if view.settings().get(SHOW_NODE_SETTINGS_NAME, False):
+            if not hasattr(self, "listener"):
+                self.listener = get_api_class("TreeSitterOnSelectionModifiedListener")()
+            self.listener.on_selection_modified_async(view)
+
+
+LAZY_API_CLASSES = (
+    lazy_text_command("TreeSitterGotoSymbolCommand"),
+    lazy_text_command("TreeSitterPrintTreeCommand"),
+    lazy_window_command("TreeSitterQuerySymbolCommand"),
+    lazy_application_command("TreeSitterReloadCommand"),
+    lazy_text_command("TreeSitterSelectAncestorCommand"),
+    lazy_text_command("TreeSitterSelectCousinsCommand"),
+    lazy_text_command("TreeSitterSelectDescendantCommand"),
+    lazy_text_command("TreeSitterSelectSiblingCommand"),
+    lazy_text_command("TreeSitterSelectSymbolsCommand"),
+    lazy_text_command("TreeSitterShowNodeUnderSelectionCommand"),
+    lazy_text_command("TreeSitterToggleShowNodeUnderSelectionCommand"),
+    TreeSitterOnSelectionModifiedListener,
+)
+
+
+# Built once per import of this module. On in-place reloads of `load.py` that reuse cached submodules, `bind` is a
+# single `dict.update`
+PLUGIN_ITEMS: tuple[tuple[str, Any], ...] = (
+    *((name, getattr(core, name)) for name in CORE_NAMES if hasattr(core, name)),
+    *((cls.__name__, cls) for cls in LAZY_API_CLASSES),
+)
+
+
+def bind(plugin_globals: dict[str, Any]):
+    """
+    Bind commands and listeners into `plugin_globals`, the globals of the plugin module. Names missing from `core` are
+    skipped.
+    """
+    plugin_globals.update(PLUGIN_ITEMS)
@@ -39,10 +39,12 @@ from __future__ import annotations
 import os
 import subprocess
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from shutil import rmtree
-from threading import Thread
-from typing import TYPE_CHECKING, TypedDict, cast
+from threading import Lock, Thread, local
+from typing import TYPE_CHECKING, Any, Callable, TypedDict, cast
 
 import sublime
 import sublime_plugin
@@ -56,11 +58,13 @@ from .utils import (
     ScopeType,
     SettingsDict,
     add_path,
+    clear_settings_cache,
     get_debug,
     get_language_name_to_debounce_ms,
     get_language_name_to_parser_path,
     get_language_name_to_repo,
     get_language_name_to_scopes,
+    get_max_cached_trees,
     get_scope_to_language_name,
     get_settings,
     get_settings_dict,
@@ -68,15 +72,31 @@ from .utils import (
 )
 
 if TYPE_CHECKING:
-    from tree_sitter import Language, Parser, Tree
+    from tree_sitter import Language, Parser, Query, Tree
 
 PROJECT_REPO = "https://github.com/sublime-treesitter/TreeSitter"
+MAX_INSTALL_WORKERS = 4
 
 MAX_CACHED_TREES = 16
+MAX_LINE_WALK = 256
+PARTIAL_PARSE_MIN_BYTES = 1024 * 1024
+PARTIAL_PARSE_PADDING = 8192
+MAX_CACHED_QUERIES = 64
+# Points between entries of a tree dict's `byte_index`, see `tree_byte_offset`
+BYTE_INDEX_STRIDE = 4096
 SCOPE_TO_LANGUAGE: dict[ScopeType, Language] = {}
 
-# LRU cache, dict of `(buffer_id, syntax)` tuple keys pointing to dict with tree instance and other metadata.
-BUFFER_ID_TO_TREE: dict[int, TreeDict] = {}
+# Memoizes `check_scope` for scopes not in `SCOPE_TO_LANGUAGE`. Clear it whenever `SCOPE_TO_LANGUAGE` changes
+SCOPE_TO_CHECKED_SCOPE: dict[str, ScopeType | None] = {}
+
+# LRU cache, `buffer_id` keys pointing to dict with tree instance and other metadata. Least recently used first.
+BUFFER_ID_TO_TREE: OrderedDict[int, TreeDict] = OrderedDict()
+
+# LRU cache, `(scope, query_s)` keys pointing to compiled query, and language it was compiled for
+SCOPE_QUERY_TO_QUERY: OrderedDict[tuple[ScopeType, str], tuple[Language, Query]] = OrderedDict()
+
+# Holds a `Parser` for each thread that parses, see `get_parser`
+THREAD_PARSERS = local()
 
 # These need to be added to plugin host's `sys.path` before other plugins that depend on them load
 add_path(str(LIB_PATH))
@@ -85,8 +105,20 @@ add_path(str(LIB_PATH))
 class TreeDict(TypedDict):
     tree: Tree
     s: str
+    # `s` encoded to UTF-8, i.e. the source `tree` was parsed from
+    source: bytes
     scope: ScopeType
     updated_s: float
+    # Row and byte offset of the start of a line in `s`, near the last edit, see `get_line_start_byte`
+    line_start: tuple[int, int]
+    # Whether `tree` only spans lines around the visible region, see `parse_visible`
+    partial: bool
+    # `View.change_count` of buffer when its text was `s`
+    change_count: int
+    # Byte offsets of every `BYTE_INDEX_STRIDE`th point of `s`, built on first use by `tree_byte_offset`
+    byte_index: list[int] | None
+    # Depths of nodes in `tree` by `Node.id`, filled in by `get_depth`
+    node_id_to_depth: dict[int, int]
 
 
 class MutableSettings(TypedDict):
@@ -100,6 +132,14 @@ class MutableSettings(TypedDict):
 mutable_settings = MutableSettings(settings=None)
 
 
+def on_settings_change():
+    """
+    Settings-derived values are cached, see `cache_until_settings_change`, so clear them before anything else runs.
+    """
+    clear_settings_cache()
+    on_update_python_path()
+
+
 def on_update_python_path():
     """
     Reinstantiate languages in case `python_path` setting updated.
@@ -116,24 +156,27 @@ def on_update_python_path():
 
 def on_load():
     """
-    Called in `plugin_loaded` in `load.py`. Called after plugin is loaded (we can use functions like
-    `sublime.load_settings`), but before events fired.
+    Queued on Sublime's async thread by `plugin_loaded` in `load.py`. Called after plugin is loaded (we can use
+    functions like `sublime.load_settings`).
+
+    Because async callbacks are handled in FIFO order, this runs before any parse queued by event listeners. Until it's
+    done `SCOPE_TO_LANGUAGE` is empty, so commands and `get_tree_dict` return early instead of parsing.
 
     We load any uncloned or unbuilt languages in the background, and if a language needed to parse the active view was
     just installed, we parse this view when we're finished.
     """
-    try:
-        # Ensure "build path" exists for users managing their own languages
-        os.makedirs(BUILD_PATH)
-    except FileExistsError:
-        pass
+    # Ensure "build path" exists for users managing their own languages
+    os.makedirs(BUILD_PATH, exist_ok=True)
+
+    # Settings may have been read, and cached, before the API was ready
+    clear_settings_cache()
 
     settings = get_settings()
-    mutable_settings["settings"] = get_settings_dict(settings)
+    settings_dict = mutable_settings["settings"] = get_settings_dict()
     settings.clear_on_change("TreeSitter")
-    settings.add_on_change("TreeSitter", on_update_python_path)
+    settings.add_on_change("TreeSitter", on_settings_change)
 
-    if not get_settings_dict().get("python_path"):
+    if not settings_dict.get("python_path"):
         log("`python_path` not set, using language binaries bundled with tree_sitter_languages")
     else:
         log(f'`python_path` set, language repos and .so files installed at "{BUILD_PATH}"')
@@ -154,26 +197,71 @@ def clone_language(org_and_repo: str, branch: str = ""):
         subprocess.run(["git", "checkout", branch], cwd=repo_path, check=True)
 
 
+def run_in_parallel(func: Callable[..., Any], args_list: list[tuple[Any, ...]]) -> list[tuple[Any, ...]]:
+    """
+    Call `func` with each args tuple in `args_list`, in up to `MAX_INSTALL_WORKERS` threads. An exception raised by a
+    call is logged as soon as the call finishes, and doesn't stop other calls.
+
+    Returns args tuples of calls that raised.
+    """
+    failed: list[tuple[Any, ...]] = []
+    if not args_list:
+        return failed
+    with ThreadPoolExecutor(max_workers=min(MAX_INSTALL_WORKERS, len(args_list))) as executor:
+        future_to_args = {executor.submit(func, *args): args for args in args_list}
+        for future in as_completed(future_to_args):
+            args = future_to_args[future]
+            try:
+                future.result()
+            except Exception as e:
+                log(f"error calling {func.__name__} with {args}: {e}", with_status=True)
+                failed.append(args)
+    return failed
+
+
 def get_so_file(language_name: str):
     return f"language-{language_name}.so"
 
 
-def clone_languages():
+def get_installed_language_names():
+    """
+    Deduped, in the order they're listed in settings, so languages are cloned and built in a predictable order.
+    """
+    return list(dict.fromkeys(get_settings_dict()["installed_languages"]))
+
+
+def get_build_files():
+    """
+    Get names of files in `BUILD_PATH`, i.e. cloned language repos and built `.so` files. Empty if `BUILD_PATH` is
+    missing, e.g. if cache was cleared while Sublime was running, so nothing is treated as cloned or built.
+    """
+    try:
+        with os.scandir(BUILD_PATH) as it:
+            return {entry.name for entry in it}
+    except FileNotFoundError:
+        return set()
+
+
+def clone_languages(language_names: list[str] | None = None, files: set[str] | None = None):
     """
     Clone language repos from which language `.so` files can be built.
 
     This function is NOOP if `python_path` not set.
+
+    `language_names` and `files` default to `get_installed_language_names()` and `get_build_files()`. Pass them to share
+    them with `build_languages` and `instantiate_languages`. Cloned repos are added to `files`.
     """
     settings_dict = get_settings_dict()
     if not settings_dict.get("python_path"):
         # Rely instead on language binaries bundled with tree_sitter_languages
         return
 
-    language_names = settings_dict["installed_languages"]
-    files = set(f for f in os.listdir(BUILD_PATH))
+    language_names = get_installed_language_names() if language_names is None else language_names
+    files = get_build_files() if files is None else files
     language_name_to_repo = get_language_name_to_repo()
+    clone_args: dict[str, tuple[str, str]] = {}
 
-    for name in set(language_names):
+    for name in language_names:
         if name not in language_name_to_repo:
             log(f'"{name}" language is not supported, read more at {PROJECT_REPO}')
             continue
@@ -181,19 +269,22 @@ def clone_languages():
         repo_dict = language_name_to_repo[name]
         org_and_repo = repo_dict["repo"]
         _, repo = org_and_repo.split("/")
-        if repo in files:
-            # We've already cloned this repo
+        if repo in files or repo in clone_args:
+            # We've already cloned this repo, or it's used by another language that's being installed
             continue
 
         log_s = f"installing {org_and_repo} repo for {name} language"
         if branch := repo_dict.get("branch", ""):
             log_s = f"{log_s}, and checking out {branch}"
         log(log_s, with_status=True)
-        clone_language(org_and_repo, branch=repo_dict.get("branch", ""))
-        files.add(repo)  # Avoid cloning a repo used for multiple languages multiple times
+        clone_args[repo] = (org_and_repo, branch)
 
+    # Clones are network-bound, so clone repos in parallel
+    failed = run_in_parallel(clone_language, list(clone_args.values()))
+    files.update(repo for repo, args in clone_args.items() if args not in failed)
 
-def build_languages():
+
+def build_languages(language_names: list[str] | None = None, files: set[str] | None = None):
     """
     Build missing language `.so` files for installed languages. We use python 3.8 executable to build languages, because
     the python bundled with Sublime can't do this.
@@ -201,23 +292,26 @@ def build_languages():
     This function is NOOP if `python_path` not set, in which case we rely on bundled `tree_sitter_languages`.
 
     Note: `installed_languages` specified in `TreeSitter.sublime-settings`, `python` and `json` installed by default.
+
+    See `clone_languages` for `language_names` and `files`. Built `.so` files are added to `files`.
     """
     settings_dict = get_settings_dict()
     if not (python_path := settings_dict.get("python_path")):
         # Rely instead on language binaries bundled with tree_sitter_languages
         return
 
-    language_names = settings_dict["installed_languages"]
+    language_names = get_installed_language_names() if language_names is None else language_names
 
     pip_path = settings_dict.get("pip_path")
     if not pip_path:
         head, _ = os.path.split(python_path)
         pip_path = str(Path(head) / "pip")
 
-    files = set(f for f in os.listdir(BUILD_PATH))
+    files = get_build_files() if files is None else files
     language_name_to_parser_path = get_language_name_to_parser_path()
+    build_args: list[tuple[str, str, str]] = []
 
-    for name in set(language_names):
+    for name in language_names:
         if (so_file := get_so_file(name)) in files:
             # We've already built this .so file
             continue
@@ -225,34 +319,53 @@ def build_languages():
         if name not in language_name_to_parser_path:
             continue
 
-        path = language_name_to_parser_path[name]
+        build_args.append((name, language_name_to_parser_path[name], so_file))
+
+    def build_language(name: str, path: str, so_file: str):
+        """
+        Failed builds are logged, and don't stop other builds, or languages that were built from being instantiated.
+        """
         log(f"building {name} language from files at {path}", with_status=True)
-        subprocess.run(
-            [
-                os.path.expanduser(python_path),
-                str(BUILD_PY_PATH),
-                os.path.expanduser(pip_path),
-                str(BUILD_PATH / path),
-                str(BUILD_PATH / so_file),
-            ],
-            check=True,
-        )
+        try:
+            subprocess.run(
+                [
+                    os.path.expanduser(python_path),
+                    str(BUILD_PY_PATH),
+                    os.path.expanduser(pip_path),
+                    str(BUILD_PATH / path),
+                    str(BUILD_PATH / so_file),
+                ],
+                check=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            log(f"error building {name} language: {e}", with_status=True)
+            return
+        files.add(so_file)
+        log(f"built {name} language", with_status=True)
 
+    # The first build installs Tree-sitter bindings for `python_path` if they're missing, so it runs on its own. The
+    # rest are independent, so they run in parallel, even if the first build failed
+    if build_args:
+        build_language(*build_args[0])
+    run_in_parallel(build_language, build_args[1:])
 
-def instantiate_languages():
+
+def instantiate_languages(language_names: list[str] | None = None, files: set[str] | None = None):
     """
     Instantiate `Language`s from language binaries, and put them in `SCOPE_TO_LANGUAGE`. This takes about 0.1ms for 2
     languages on my machine.
+
+    See `clone_languages` for `language_names` and `files`.
     """
     from tree_sitter import Language
     from tree_sitter_languages import get_language
 
     settings_dict = get_settings_dict()
     python_path = settings_dict.get("python_path")
-    language_names = settings_dict["installed_languages"]
+    language_names = get_installed_language_names() if language_names is None else language_names
     language_name_to_scopes = get_language_name_to_scopes()
 
-    for name in set(language_names):
+    for name in language_names:
         if name not in language_name_to_scopes:
             continue
 
@@ -262,7 +375,8 @@ def instantiate_languages():
 
         language: Language | None = None
         if python_path:
-            files = set(f for f in os.listdir(BUILD_PATH))
+            if files is None:
+                files = get_build_files()
             if (so_file := get_so_file(name)) not in files:
                 continue
 
@@ -277,6 +391,8 @@ def instantiate_languages():
         for scope in language_name_to_scopes[name]:
             SCOPE_TO_LANGUAGE[scope] = language
 
+    SCOPE_TO_CHECKED_SCOPE.clear()
+
 
 #
 # Code for caching syntax trees by their `buffer_id`s, and keeping them in sync as `TextChange`s occur
@@ -296,14 +412,22 @@ def check_scope(scope: str | None):
         return None
     if scope in SCOPE_TO_LANGUAGE:
         return scope
+    if scope in SCOPE_TO_CHECKED_SCOPE:
+        # This runs on every text change, even in buffers with unsupported scopes, so avoid scanning supported scopes
+        return SCOPE_TO_CHECKED_SCOPE[scope]
 
+    checked_scope: ScopeType | None = None
     scopes = list(SCOPE_TO_LANGUAGE.keys())
     for supported_scope in scopes:
         if scope.startswith(f"{supported_scope}."):
-            return supported_scope
+            checked_scope = supported_scope
+            break
 
+    SCOPE_TO_CHECKED_SCOPE[scope] = checked_scope
+    return checked_scope
 
-def byte_offset(point: int, s: str):
+
+def byte_offset(point: int, s: str, source: bytes | None = None):
     """
     Convert a Sublime [Point](https://www.sublimetext.com/docs/api_reference.html#sublime.Point), the offset from the
     beginning of the buffer in UTF-8 code points, to a byte offset. For UTF-8, byte is the same as "code unit".
@@ -317,25 +441,64 @@ def byte_offset(point: int, s: str):
     just one user-perceived character, e.g. this one: שָׁ
 
     More info here: http://utf8everywhere.org/, https://tonsky.me/blog/unicode/
+
+    ---
+
+    `str.isascii` is constant time, because Python strings record whether they're ASCII. For ASCII strings, points are
+    already byte offsets, so nothing is copied or encoded.
+
+    If `source`, i.e. `s` encoded, is passed, points past the middle of `s` are converted by encoding the text after
+    them instead, so at most half of `s` is encoded.
     """
+    if point >= 0 and s.isascii():
+        return min(point, len(s))
+    if source is not None and len(s) // 2 < point <= len(s):
+        return len(source) - len(s[point:].encode())
     return len(s[:point].encode())
 
 
+def tree_byte_offset(tree_dict: TreeDict, point: int) -> int:
+    """
+    Like `byte_offset`, for the text of `tree_dict`, but without encoding the text up to `point`. Points are clamped to
+    the text.
+
+    If the text is ASCII, which `str.isascii` checks in constant time, points are already byte offsets. Otherwise, an
+    index of the byte offsets of every `BYTE_INDEX_STRIDE`th point is built on first use, and at most
+    `BYTE_INDEX_STRIDE` code points are encoded per call. Tree dicts are replaced, never mutated, when text changes, so
+    the index is never stale.
+    """
+    s = tree_dict["s"]
+    point = max(0, min(point, len(s)))
+    if s.isascii():
+        return point
+
+    if (byte_index := tree_dict["byte_index"]) is None:
+        byte_index = [0]
+        offset = 0
+        for start in range(0, len(s), BYTE_INDEX_STRIDE):
+            offset += len(s[start : start + BYTE_INDEX_STRIDE].encode())
+            byte_index.append(offset)
+        tree_dict["byte_index"] = byte_index
+
+    start = point - point % BYTE_INDEX_STRIDE
+    return byte_index[start // BYTE_INDEX_STRIDE] + len(s[start:point].encode())
+
+
 def get_edit(
     change: sublime.TextChange,
-    s: str,
-    should_change_s: bool,
-) -> tuple[tuple[int, int, int, tuple[int, int], tuple[int, int], tuple[int, int]], str]:
+    start_byte: int,
+    change_bytes: bytes,
+) -> tuple[int, int, int, tuple[int, int], tuple[int, int], tuple[int, int]]:
     """
     Args:
 
-    - `s`: Buffer text before text change was applied
     - `change`: TextChange
-    - `should_change_s`: Should we change s? Not doing so for final TextChange in "group" is a performance optimization
+    - `start_byte`: Byte offset of `change.a.pt`, in buffer text before text change was applied
+    - `change_bytes`: `change.str` encoded to UTF-8
 
     Returns:
 
-    - Tuple with updated `s` after change applied, and `Tree.edit` args
+    - `Tree.edit` args
 
     ---
 
@@ -366,10 +529,7 @@ def get_edit(
     - https://github.com/tree-sitter/tree-sitter/issues/1792
     - https://github.com/tree-sitter/tree-sitter/issues/210
     """
-    changed_s = s
-
     # Initialize variables assuming neither insertion nor deletion
-    start_byte = byte_offset(change.a.pt, s)
     old_end_byte = start_byte
     new_end_byte = start_byte
 
@@ -380,63 +540,173 @@ def get_edit(
     if change.a.pt < change.b.pt:
         # Deletion
         old_end_byte = start_byte + change.len_utf8
-        if should_change_s:
-            changed_s = changed_s[: change.a.pt] + changed_s[change.b.pt :]
 
     if change.str:
         # Insertion, note that `start_byte`, `old_end_byte`, `start_point`, and `old_end_point` have already been set
-        change_bytes = change.str.encode()
         new_end_byte = start_byte + len(change_bytes)
 
-        lines = change_bytes.splitlines()
-        last_line = lines[-1]
-        new_end_col = change.a.col_utf8 + len(last_line) if len(lines) == 1 else len(last_line)
-        new_end_point = (change.a.row + len(lines) - 1, new_end_col)
-        if should_change_s:
-            changed_s = changed_s[: change.a.pt] + change.str + changed_s[change.a.pt :]
+        # `count` and `rfind` scan inserted text without building a list of its lines, which matters for big pastes
+        newlines = change_bytes.count(b"\n")
+        if newlines == 0:
+            new_end_col = change.a.col_utf8 + len(change_bytes)
+        else:
+            new_end_col = len(change_bytes) - change_bytes.rfind(b"\n") - 1
+        new_end_point = (change.a.row + newlines, new_end_col)
+
+    return (start_byte, old_end_byte, new_end_byte, start_point, old_end_point, new_end_point)
+
 
-    return (start_byte, old_end_byte, new_end_byte, start_point, old_end_point, new_end_point), changed_s
+def get_line_start_byte(source: bytes | bytearray, row: int, line_start: tuple[int, int]):
+    """
+    Get byte offset of the start of line `row` in `source`, where `line_start` is the row and byte offset of the start
+    of another line. Walks line by line from `line_start`, so this is O(distance) for nearby lines, which is the common
+    case for edits. Lines further than `MAX_LINE_WALK` away are found by splitting `source` from the beginning.
+
+    Raises `ValueError` if `source` has no line `row`.
+    """
+    anchor_row, byte = line_start
+    if abs(row - anchor_row) > MAX_LINE_WALK:
+        lines = source.split(b"\n", row)
+        if len(lines) <= row:
+            raise ValueError(f"source has no line {row}")
+        return len(source) - len(lines[-1])
+
+    while anchor_row < row:
+        if (newline := source.find(b"\n", byte)) < 0:
+            raise ValueError(f"source has no line {row}")
+        byte = newline + 1
+        anchor_row += 1
+    while anchor_row > row:
+        byte = source.rfind(b"\n", 0, byte - 1) + 1
+        anchor_row -= 1
+    return byte
 
 
 def edit(
     parser: Parser,
     scope: ScopeType,
     changes: list[sublime.TextChange],
-    tree: Tree,
-    s: str,
-    new_s: str,
-    debug: bool = False,
-) -> Tree:
+    tree: Tree | None,
+    source: bytes,
+    line_start: tuple[int, int] = (0, 0),
+) -> tuple[Tree, bytes, tuple[int, int]]:
     """
-    To get the new tree, do `new_tree = parser.parse(new_s, tree)`
+    To get the new tree, do `new_tree = parser.parse(new_source, tree)`
 
     Note that Sublime serializes text changes s.t. that they can be applied as is and in order, even if text is replaced
     and/or there are multiple selections.
+
+    Changes are applied to a copy of `source`, the buffer's UTF-8 bytes before the changes, by splicing it in place.
+    This means neither the old nor the new buffer text is encoded on every edit. The byte offset of each change is the
+    byte offset of the start of its row, plus its UTF-8 column. Line starts are found relative to `line_start`, see
+    `get_line_start_byte`, so edits near the previous edit are cheap even at the end of a big buffer.
+
+    Pass `tree=None` to parse the new source from scratch, e.g. if the old tree is partial, see `parse_visible`. Trees
+    parsed with included ranges can't be reused by a parser without them.
+
+    Returns the new tree, the new source, and the row and byte offset of the start of the line of the last change.
+
+    Raises `ValueError` if a change doesn't fit in the text it applies to, i.e. if `source` or `line_start` is out of
+    sync with the buffer. Parse the buffer's text from scratch instead.
     """
     parser.set_language(SCOPE_TO_LANGUAGE[scope])
 
-    changed_s = s
-    for idx, change in enumerate(changes):
-        should_change_s = debug or idx < len(changes) - 1  # Performance optimization, see `get_edit`
-        edit_tuple, changed_s = get_edit(change, changed_s, should_change_s)
-        tree.edit(*edit_tuple)
+    new_source = bytearray(source)
+
+    for change in changes:
+        row = change.a.row
+        # Text before the start of `row` is unchanged by this change, so `line_start` stays valid after splicing
+        line_start = (row, get_line_start_byte(new_source, row, line_start))
+        start_byte = line_start[1] + change.a.col_utf8
+        if (line_end := new_source.find(b"\n", line_start[1])) < 0:
+            line_end = len(new_source)
+        if start_byte > line_end or start_byte + change.len_utf8 > len(new_source):
+            raise ValueError(f"text change at row {row} doesn't fit in source")
+
+        change_bytes = change.str.encode()
+        if tree:
+            tree.edit(*get_edit(change, start_byte, change_bytes))
+        new_source[start_byte : start_byte + change.len_utf8] = change_bytes
+
+    # Trees keep a reference to their source for `Node.text`, so parse an immutable copy
+    new_source = bytes(new_source)
+    new_tree = parser.parse(new_source, tree) if tree else parser.parse(new_source)
+    return new_tree, new_source, line_start
+
+
+def get_parser() -> Parser:
+    """
+    Get the parser for the current thread, so parsers are reused instead of instantiated for every parse. Parsers
+    aren't thread safe, and parses happen on the async thread, the UI thread, and the thread installing languages, so
+    each thread gets its own.
+
+    This is also a lazy loading hack. We can't get settings, which means we can't ensure `tree_sitter` is installed,
+    until the plugin is loaded and plugin classes have been instantiated.
+    """
+    parser = getattr(THREAD_PARSERS, "parser", None)
+    if parser is None:
+        from tree_sitter import Parser
 
-    if debug:
-        # Applying changes to `s` must yield `new_s`
-        assert changed_s == new_s
-    return parser.parse(new_s.encode(), tree)
+        parser = THREAD_PARSERS.parser = Parser()
+    return parser
 
 
-def parse(parser: Parser, scope: ScopeType, s: str) -> Tree:
+def parse(parser: Parser, scope: ScopeType, s: str | bytes) -> Tree:
     """
     Note: the `set_language` call costs nothing, I can call it 2 million times a second on 2021 M1 MPB with 16gb RAM.
     """
     parser.set_language(SCOPE_TO_LANGUAGE[scope])
-    return parser.parse(s.encode())
+    return parser.parse(s.encode() if isinstance(s, str) else s)
+
+
+def get_query(scope: ScopeType, query_s: str) -> Query:
+    """
+    Get compiled query for `query_s`. Compiling a query is expensive, and gets much slower with query size, so compiled
+    queries are cached.
+
+    Cached queries are recompiled if the scope's `Language` instance has changed since, e.g. if languages were
+    reinstantiated because `python_path` changed.
+    """
+    language = SCOPE_TO_LANGUAGE[scope]
+    key = (scope, query_s)
+
+    cached = SCOPE_QUERY_TO_QUERY.get(key)
+    if cached and cached[0] is language:
+        query = cached[1]
+    else:
+        query = language.query(query_s)
+        SCOPE_QUERY_TO_QUERY[key] = (language, query)
 
+    SCOPE_QUERY_TO_QUERY.move_to_end(key)
+    while len(SCOPE_QUERY_TO_QUERY) > MAX_CACHED_QUERIES:
+        SCOPE_QUERY_TO_QUERY.popitem(last=False)
+    return query
 
-def make_tree_dict(tree: Tree, s: str, scope: ScopeType) -> TreeDict:
-    return {"tree": tree, "s": s, "updated_s": time.monotonic(), "scope": scope}
+
+def make_tree_dict(
+    tree: Tree,
+    s: str,
+    scope: ScopeType,
+    source: bytes | None = None,
+    line_start: tuple[int, int] = (0, 0),
+    partial: bool = False,
+    change_count: int = 0,
+) -> TreeDict:
+    """
+    Pass `source` if `s` has already been encoded, to avoid encoding it again.
+    """
+    return {
+        "tree": tree,
+        "s": s,
+        "source": s.encode() if source is None else source,
+        "updated_s": time.monotonic(),
+        "scope": scope,
+        "line_start": line_start,
+        "partial": partial,
+        "change_count": change_count,
+        "byte_index": None,
+        "node_id_to_depth": {},
+    }
 
 
 def get_scope(view: View) -> str | None:
@@ -466,33 +736,146 @@ def get_view_text(view: View):
     return view.substr(sublime.Region(0, view.size()))
 
 
-def trim_cached_trees(size: int = MAX_CACHED_TREES):
+def get_view_text_and_change_count(view: View):
+    """
+    Get view text, and the `View.change_count` it corresponds to. Safe to call off the UI thread, where the buffer can
+    change while its text is being read.
+    """
+    while True:
+        change_count = view.change_count()
+        view_text = get_view_text(view)
+        if view.change_count() == change_count:
+            return view_text, change_count
+
+
+def trim_cached_trees(size: int | None = None):
     """
-    Note that trimming an item is O(N) in `MAX_CACHED_TREES`.
+    Evict least recently used trees until at most `size` remain. Trimming an item is O(1).
 
-    This is fast enough, and much easier than using heapq or similar to implement a sorted set.
+    `size` defaults to the `max_cached_trees` setting, or `MAX_CACHED_TREES`. Raise the setting to keep trees of
+    buffers that are open but rarely focused from being evicted by a stream of transient views, e.g. diffs.
     """
-    while len(BUFFER_ID_TO_TREE) > MAX_CACHED_TREES:
-        _, buffer_id = min((d["updated_s"], buffer_id) for buffer_id, d in BUFFER_ID_TO_TREE.items())
-        BUFFER_ID_TO_TREE.pop(buffer_id, None)
+    if size is None:
+        size = max(get_max_cached_trees() or MAX_CACHED_TREES, 1)
+    while len(BUFFER_ID_TO_TREE) > size:
+        BUFFER_ID_TO_TREE.popitem(last=False)
 
 
-def parse_view(parser: Parser, view: View, view_text: str, publish_update: bool = True):
+def cache_tree_dict(buffer_id: int, tree_dict: TreeDict):
+    """
+    Cache `tree_dict` as the most recently used tree, and trim cached trees.
+    """
+    BUFFER_ID_TO_TREE[buffer_id] = tree_dict
+    BUFFER_ID_TO_TREE.move_to_end(buffer_id)
+    trim_cached_trees()
+
+
+def touch_tree_dict(buffer_id: int):
+    """
+    Mark tree for `buffer_id` as most recently used, if it's cached.
+    """
+    try:
+        BUFFER_ID_TO_TREE.move_to_end(buffer_id)
+    except KeyError:
+        pass
+
+
+def parse_visible(parser: Parser, scope: ScopeType, view: View, view_text: str, source: bytes) -> Tree:
+    """
+    Parse only the lines of the view's visible region, padded by `PARTIAL_PARSE_PADDING` code points on either side,
+    with `Parser.set_included_ranges`. Nodes outside these lines are missing from the tree, but byte offsets and points
+    of nodes in the tree are relative to the whole buffer.
+    """
+    from tree_sitter import Range
+
+    region = view.visible_region()
+    begin = view_text.rfind("\n", 0, max(0, region.begin() - PARTIAL_PARSE_PADDING)) + 1
+    end = view_text.find("\n", min(len(view_text), region.end() + PARTIAL_PARSE_PADDING))
+    end = len(view_text) if end == -1 else end + 1
+
+    start_byte = byte_offset(begin, view_text, source)
+    end_byte = start_byte + len(view_text[begin:end].encode())
+    end_line_begin = view_text.rfind("\n", 0, end) + 1
+    start_point = (view_text.count("\n", 0, begin), 0)
+    end_point = (view_text.count("\n", 0, end), len(view_text[end_line_begin:end].encode()))
+
+    parser.set_language(SCOPE_TO_LANGUAGE[scope])
+    parser.set_included_ranges([Range(start_point, end_point, start_byte, end_byte)])
+    try:
+        return parser.parse(source)
+    finally:
+        parser.set_included_ranges([])
+
+
+def complete_partial_tree(view: View, buffer_id: int, publish_update: bool = True):
+    """
+    Replace partial tree for `buffer_id`, see `parse_visible`, with a tree for the whole buffer. Bails out if the tree
+    was already replaced, e.g. by an edit, because edits parse the whole buffer, and publish their own update.
+    """
+    tree_dict = BUFFER_ID_TO_TREE.get(buffer_id)
+    if not tree_dict or not tree_dict["partial"]:
+        return
+
+    scope, source = tree_dict["scope"], tree_dict["source"]
+    tree = parse(get_parser(), scope, s=source)
+    cache_tree_dict(
+        buffer_id,
+        make_tree_dict(
+            tree,
+            tree_dict["s"],
+            scope,
+            source,
+            tree_dict["line_start"],
+            change_count=tree_dict["change_count"],
+        ),
+    )
+    if publish_update:
+        publish_tree_update(view.window(), buffer_id=buffer_id, scope=scope)
+
+
+def parse_view(
+    parser: Parser,
+    view: View,
+    view_text: str,
+    publish_update: bool = True,
+    change_count: int | None = None,
+    buffer_id: int | None = None,
+):
     """
     Defined outside of `TreeSitterEventListener` so it can be called by anything, e.g. called on the active buffer after
     a new language is installed and loaded.
+
+    `change_count` is the `View.change_count` of `view_text`. Pass it if `view_text` was read earlier, e.g. on the UI
+    thread before this is called on the async thread. Likewise, pass `buffer_id` if it's already known.
+
+    Buffers of at least `PARTIAL_PARSE_MIN_BYTES` are first parsed around the visible region, see `parse_visible`, so
+    the visible part of the tree is available sooner. The whole buffer is parsed in a callback queued right after.
+    Partial trees are only returned by `get_tree_dict`, with `partial` set. Subscribers to tree updates are notified
+    once the whole buffer is parsed, so published trees always span the whole buffer.
     """
     scope = get_scope(view)
     if not (scope := check_scope(scope)):
         return
 
-    buffer_id = view.buffer().id()
-    tree = parse(parser, scope, s=view_text)
+    if buffer_id is None:
+        buffer_id = view.buffer().id()
+    source = view_text.encode()
+    partial = len(source) >= PARTIAL_PARSE_MIN_BYTES
+    if partial:
+        tree = parse_visible(parser, scope, view, view_text, source)
+    else:
+        tree = parse(parser, scope, s=source)
 
-    BUFFER_ID_TO_TREE[buffer_id] = make_tree_dict(tree, view_text, scope)
-    trim_cached_trees()
+    if change_count is None:
+        change_count = view.change_count()
+    cache_tree_dict(
+        buffer_id,
+        make_tree_dict(tree, view_text, scope, source, partial=partial, change_count=change_count),
+    )
 
-    if publish_update:
+    if partial:
+        sublime.set_timeout_async(lambda: complete_partial_tree(view, buffer_id, publish_update))
+    elif publish_update:
         publish_tree_update(view.window(), buffer_id=buffer_id, scope=scope)
 
     return tree
@@ -507,14 +890,16 @@ def install_languages():
 
     Idempotent. Also, doesn't reclone/rebuild/reinstantiate languages that have been cloned/built/instantiated.
     """
-    from tree_sitter import Parser
-
-    clone_languages()
-    build_languages()
-    instantiate_languages()
+    # Read installed languages and list build directory once, and share them
+    language_names = get_installed_language_names()
+    files = get_build_files() if get_settings_dict().get("python_path") else None
+    clone_languages(language_names, files)
+    build_languages(language_names, files)
+    instantiate_languages(language_names, files)
     if view := sublime.active_window().active_view():
         if view.buffer().id() not in BUFFER_ID_TO_TREE:
-            parse_view(Parser(), view, get_view_text(view), publish_update=False)
+            view_text, change_count = get_view_text_and_change_count(view)
+            parse_view(get_parser(), view, view_text, publish_update=False, change_count=change_count)
 
 
 class TreeSitterUpdateTreeCommand(sublime_plugin.WindowCommand):
@@ -538,27 +923,44 @@ class TreeSitterEventListener(sublime_plugin.EventListener):
 
     [This is a serious bug in the plugin API](https://github.com/sublimehq/sublime_text/issues/2234). Our workaround is
     to ensure client code can only access trees through `get_tree_dict`, which handles syntax changes on read.
+
+    Loads are coalesced. On startup Sublime activates every restored view in quick succession, and `on_activated` and
+    `on_load` can both fire for the same buffer. Views to parse are collected by buffer id, and parsed once each by a
+    single async callback.
     """
 
-    @property
-    def parser(self):
+    def __init__(self, *args, **kwargs):
+        # Guards `pending_loads` and `drain_scheduled`, which are updated on the UI thread and the async thread
+        self.loads_lock = Lock()
+        self.pending_loads: dict[int, View] = {}
+        self.drain_scheduled = False
+        super().__init__(*args, **kwargs)
+
+    def handle_load(self, view: View, buffer_id: int | None = None):
         """
-        This is a lazy loading hack. We can't get settings, which means we can't ensure `tree_sitter` is installed,
-        until the plugin is loaded and plugin classes have been instantiated.
+        Pass `buffer_id` if the caller already has it, to save API calls.
         """
-        if not hasattr(self, "_parser"):
-            from tree_sitter import Parser
-
-            self._parser = Parser()
-        return self._parser
-
-    def handle_load(self, view: View):
-        s = get_view_text(view)
-
-        def cb():
-            parse_view(self.parser, view, s)
-
-        sublime.set_timeout_async(callback=cb, delay=0)
+        if buffer_id is None:
+            buffer_id = view.buffer().id()
+        with self.loads_lock:
+            self.pending_loads[buffer_id] = view
+            if self.drain_scheduled:
+                return
+            self.drain_scheduled = True
+        sublime.set_timeout_async(callback=self.drain_loads, delay=0)
+
+    def drain_loads(self):
+        """
+        Parse each pending view once. View text is read here, on the async thread, with its change count, so text
+        changes queued before the text was read are skipped by `TreeSitterTextChangeListener`.
+        """
+        with self.loads_lock:
+            pending_loads, self.pending_loads = self.pending_loads, {}
+            self.drain_scheduled = False
+        for buffer_id, view in pending_loads.items():
+            if view.is_valid():
+                view_text, change_count = get_view_text_and_change_count(view)
+                parse_view(get_parser(), view, view_text, change_count=change_count, buffer_id=buffer_id)
 
     def on_close(self, view: View):
         """
@@ -566,23 +968,26 @@ class TreeSitterEventListener(sublime_plugin.EventListener):
         buffer is "dead". This way clients don't accidentally use them.
         """
         if not view.clones():
-            BUFFER_ID_TO_TREE.pop(view.buffer().id(), None)
+            buffer_id = view.buffer().id()
+            BUFFER_ID_TO_TREE.pop(buffer_id, None)
+            with self.loads_lock:
+                self.pending_loads.pop(buffer_id, None)
 
     def on_activated(self, view: View):
         """
         Called when view gains focus. Ensures that we parse buffers on Sublime Text startup, where `on_load` callbacks
         not called. Testing shows that `on_text_changed` callbacks always enqueued after `on_activated` callbacks.
         """
-        if view.buffer().id() not in BUFFER_ID_TO_TREE:
-            self.handle_load(view)
+        if (buffer_id := view.buffer().id()) not in BUFFER_ID_TO_TREE:
+            self.handle_load(view, buffer_id)
 
     def on_load(self, view: View):
         """
         Testing suggests that `on_activated` always called before `on_load`. To be extra safe, we handle both of these
         events, and bail out if the other has already run for a given buffer.
         """
-        if view.buffer().id() not in BUFFER_ID_TO_TREE:
-            self.handle_load(view)
+        if (buffer_id := view.buffer().id()) not in BUFFER_ID_TO_TREE:
+            self.handle_load(view, buffer_id)
 
     def on_reload(self, view: View):
         self.handle_load(view)
@@ -600,75 +1005,132 @@ class TreeSitterTextChangeListener(sublime_plugin.TextChangeListener):
 
     When a text change occurs, we get its buffer and its syntax, look up the tree and metadata, and update/create the
     tree as necessary. Every listener instance is bound to a buffer, so we know in which buffer text changes occur.
+
+    Parsing is coalesced: text changes are queued, and only the callback for the most recent text change parses, after
+    `debounce_ms`. It applies all queued changes at once with `edit`. Bursts of text changes, e.g. from fast typing or
+    while a slow parse is running, result in one parse instead of one per text change.
+
+    Text changes are queued with the buffer's `View.change_count` after they were made. Changes already reflected in the
+    cached tree, i.e. changes with a change count no greater than the tree's, are skipped, e.g. if the buffer was
+    reparsed while they were queued.
+
+    Parsing stays on the async thread. py-tree-sitter holds the GIL while it parses, so parsing in a worker thread
+    wouldn't run in parallel with anything. Splitting parses into time slices with `Parser.set_timeout_micros` isn't
+    an option either: testing shows resumed parses sometimes produce different trees than uninterrupted ones.
     """
 
     def __init__(self, *args, **kwargs):
-        self.debounce_ms: int | None = None
-        self.last_text_changed_s = 0
-        self.debug = get_debug()
+        # Incremented for each text change on the UI thread, so queued callbacks know if they're stale
+        self.generation = 0
+        # Change counts, buffer sizes after the changes, and changes not yet applied to the cached tree
+        self.pending_changes: list[tuple[int, int, list[sublime.TextChange]]] = []
         super().__init__(*args, **kwargs)
 
-    @property
-    def parser(self):
-        if not hasattr(self, "_parser"):
-            from tree_sitter import Parser
-
-            self._parser = Parser()
-        return self._parser
-
     def on_text_changed(self, changes: list[sublime.TextChange]):
+        """
+        Runs on the UI thread, so it does as little as possible. In particular it doesn't read the buffer's text; text
+        changes are spliced into the cached source instead, see `edit`.
+        """
+        # Batches that neither insert nor delete text leave source and tree unchanged, so there's nothing to parse
+        if all(not change.str and change.len_utf8 == 0 for change in changes):
+            return
+
         view = self.buffer.primary_view()
         scope = get_scope(view)
         if not (scope := check_scope(scope)):
+            # These changes won't be applied to the cached tree, so it's out of sync with the buffer from now on. Drop
+            # it, and pending changes, so the buffer's text is parsed from scratch if its syntax is supported again
+            self.drop_tree()
             return
 
-        if self.debounce_ms is None:
-            scope_to_language_name = get_scope_to_language_name()
-            language_name_to_debounce_ms = get_language_name_to_debounce_ms()
-            self.debounce_ms = round(language_name_to_debounce_ms.get(scope_to_language_name[scope], 0))
+        # Settings getters are memoized until settings change, so this is cheap, and setting changes apply right away.
+        # Scope can be missing from settings, e.g. if `language_name_to_scopes` was edited since languages were loaded
+        if not (language_name := get_scope_to_language_name().get(scope)):
+            self.drop_tree()
+            return
+        default_debounce_ms = get_settings_dict().get("debounce_ms") or 0
+        debounce_ms = round(get_language_name_to_debounce_ms().get(language_name, default_debounce_ms))
 
         buffer_id = self.buffer.id()
-        view_text = get_view_text(view)
 
-        self.last_text_changed_s = time.monotonic()
-        debounce_ms = self.debounce_ms or 0
+        self.pending_changes.append((view.change_count(), view.size(), changes))
+        self.generation += 1
+        generation = self.generation
 
         def cb():
             """
             Calling `get_view_text()` in `on_text_changed_async` doesn't always return view text right after the edit
-            because it's async.
-
-            So, we handle the text change event in the main UI thread, get the new view text right there, and queue up
-            a "background job" with `set_timeout_async` to parse the new tree. This works because `set_timeout_async`
-            uses the same queue as the other `_async` methods.
+            because it's async. So, we queue up the changes in the main UI thread, with the change count right after
+            they were made, and queue up a "background job" with `set_timeout_async` to parse the new tree. This works
+            because `set_timeout_async` uses the same queue as the other `_async` methods.
 
             Note that some language parsers are so slow they visibly affect UI thread performance. Setting a
             `debounce_ms` for these languages is recommended.
             """
-            tree_dict = BUFFER_ID_TO_TREE.get(buffer_id)
-            scope_changed = bool(tree_dict) and tree_dict["scope"] != scope
+            if generation != self.generation:
+                # A newer text change has been queued, and its callback parses all pending changes
+                return
 
-            if not tree_dict or debounce_ms > 0 or scope_changed:
-                dt_s = (time.monotonic() - self.last_text_changed_s) * 1000
-                if dt_s < debounce_ms:
+            pending_changes, self.pending_changes = self.pending_changes, []
+
+            tree: Tree | None = None
+            tree_dict = BUFFER_ID_TO_TREE.get(buffer_id)
+            if tree_dict and tree_dict["scope"] == scope:
+                changes = [
+                    change
+                    for change_count, _, changes in pending_changes
+                    if change_count > tree_dict["change_count"]
+                    for change in changes
+                ]
+                if not changes:
                     return
-                tree = parse(self.parser, scope, s=view_text)
-            else:
-                tree = edit(
-                    self.parser,
-                    scope,
-                    changes,
-                    tree_dict["tree"],
-                    s=tree_dict["s"],
-                    new_s=view_text,
-                    debug=self.debug,
-                )
-
-            BUFFER_ID_TO_TREE[buffer_id] = make_tree_dict(tree, view_text, scope)
-            trim_cached_trees()
+
+                change_count, size, _ = pending_changes[-1]
+                try:
+                    tree, source, line_start = edit(
+                        get_parser(),
+                        scope,
+                        changes,
+                        None if tree_dict["partial"] else tree_dict["tree"],
+                        source=tree_dict["source"],
+                        line_start=tree_dict["line_start"],
+                    )
+                    view_text = source.decode()
+                except Exception as e:
+                    # Cached source is out of sync with the buffer, so parse the buffer's text instead
+                    log(f"couldn't apply text changes to cached source, reparsing buffer: {e}")
+                    tree = None
+                else:
+                    if len(view_text) != size:
+                        # Changes are missing from cached source, e.g. changes made while the cached tree was replaced
+                        log("cached source out of sync with buffer, reparsing buffer", with_print=get_debug())
+                        tree = None
+
+                if tree and get_debug() and view.change_count() == change_count:
+                    # Applying changes to cached source must yield view text
+                    assert view_text == get_view_text(view)
+
+            if tree is None:
+                view_text, change_count = get_view_text_and_change_count(view)
+                source = view_text.encode()
+                tree = parse(get_parser(), scope, s=source)
+                line_start = (0, 0)
+
+            cache_tree_dict(
+                buffer_id,
+                make_tree_dict(tree, view_text, scope, source, line_start, change_count=change_count),
+            )
             publish_tree_update(view.window(), buffer_id=buffer_id, scope=scope)
 
-        sublime.set_timeout_async(callback=cb, delay=debounce_ms + 1 if debounce_ms > 0 else 0)
+        sublime.set_timeout_async(callback=cb, delay=debounce_ms)
+
+    def drop_tree(self):
+        """
+        Drop buffer's cached tree and pending changes, and make queued callbacks stale.
+        """
+        BUFFER_ID_TO_TREE.pop(self.buffer.id(), None)
+        self.pending_changes = []
+        self.generation += 1
 
 
 #
@@ -700,8 +1162,13 @@ def remove_language(language: str):
         except Exception as e:
             log(f"error removing {so_file} for {language}: {e}")
 
-    for scope in get_language_name_to_scopes().get(language, []):
+    scopes = get_language_name_to_scopes().get(language, [])
+    for scope in scopes:
         SCOPE_TO_LANGUAGE.pop(scope, None)
+    SCOPE_TO_CHECKED_SCOPE.clear()
+
+    for key in [key for key in SCOPE_QUERY_TO_QUERY if key[0] in scopes]:
+        SCOPE_QUERY_TO_QUERY.pop(key, None)
 
 
 class TreeSitterSelectLanguageMixin:
@@ -749,12 +1216,13 @@ class TreeSitterInstallLanguageCommand(TreeSitterSelectLanguageMixin, sublime_pl
         language = self.languages[idx]
 
         settings = get_settings()
-        languages = get_settings_dict()["installed_languages"]
+        languages = list(get_settings_dict()["installed_languages"])
         if language not in languages:
             languages.append(language)
 
         settings.set("installed_languages", languages)
         sublime.save_settings(SETTINGS_FILENAME)
+        clear_settings_cache()
         Thread(target=install_languages).start()
 
 
@@ -771,12 +1239,13 @@ class TreeSitterRemoveLanguageCommand(TreeSitterSelectLanguageMixin, sublime_plu
         language = self.languages[idx]
 
         settings = get_settings()
-        languages = get_settings_dict()["installed_languages"]
+        languages = list(get_settings_dict()["installed_languages"])
         while language in languages:
             languages.remove(language)
 
         settings.set("installed_languages", languages)
         sublime.save_settings(SETTINGS_FILENAME)
+        clear_settings_cache()
         Thread(target=lambda lang=language: remove_language(lang)).start()
 
 
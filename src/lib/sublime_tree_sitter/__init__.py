@@ -15,8 +15,10 @@ from TreeSitter.src.api import (
     get_descendant,
     get_larger_ancestor,
     get_node_spanning_region,
+    get_parent,
     get_query_s_from_file,
     get_region_from_node,
+    get_regions_from_nodes,
     get_scope_to_language_name,
     get_selected_nodes,
     get_sibling,
@@ -27,6 +29,7 @@ from TreeSitter.src.api import (
     get_view_from_buffer_id,
     goto_capture_options,
     goto_captures,
+    merge_queries,
     query_node_with_s,
     scroll_to_region,
     show_node_under_selection,
@@ -46,8 +49,10 @@ __all__ = [
     "get_descendant",
     "get_larger_ancestor",
     "get_node_spanning_region",
+    "get_parent",
     "get_query_s_from_file",
     "get_region_from_node",
+    "get_regions_from_nodes",
     "get_scope_to_language_name",
     "get_selected_nodes",
     "get_sibling",
@@ -58,6 +63,7 @@ __all__ = [
     "get_view_from_buffer_id",
     "goto_capture_options",
     "goto_captures",
+    "merge_queries",
     "query_node_with_s",
     "scroll_to_region",
     "show_node_under_selection",
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import TYPE_CHECKING, Literal, TypedDict, TypeVar, cast
+from typing import TYPE_CHECKING, Any, Callable, Literal, TypedDict, TypeVar, cast
 
 import sublime
 
@@ -16,6 +17,7 @@ QUERIES_PATH = PROJECT_ROOT / "queries"
 LIB_PATH = PROJECT_ROOT / "src" / "lib"
 
 SETTINGS_FILENAME = "TreeSitter.sublime-settings"
+SHOW_NODE_SETTINGS_NAME = "tree_sitter.show_node_under_selection"
 
 T = TypeVar("T")
 
@@ -55,7 +57,10 @@ class SettingsDict(TypedDict):
     language_name_to_repo: NotRequired[dict[str, RepoDict]]
     language_name_to_parser_path: NotRequired[dict[str, str]]
     language_name_to_debounce_ms: NotRequired[dict[str, float]]
+    debounce_ms: NotRequired[float]
+    max_cached_trees: NotRequired[int]
     debug: NotRequired[bool]
+    dev_reload: NotRequired[bool]
     queries_path: NotRequired[str]
 
 
@@ -245,23 +250,61 @@ def get_settings():
     return sublime.load_settings(SETTINGS_FILENAME)
 
 
+SETTINGS_CACHED_FUNCTIONS: list[Any] = []
+
+
+def cache_until_settings_change(func: Callable[[], T]) -> Callable[[], T]:
+    """
+    Memoize a function that only depends on settings. Cleared by `clear_settings_cache`.
+
+    Cached values are shared, so callers must not mutate them.
+    """
+    cached_func = lru_cache(maxsize=None)(func)
+    SETTINGS_CACHED_FUNCTIONS.append(cached_func)
+    return cached_func
+
+
+def clear_settings_cache():
+    """
+    Call this whenever settings change, and once the plugin is loaded, in case settings were read during startup.
+    """
+    for cached_func in SETTINGS_CACHED_FUNCTIONS:
+        cached_func.cache_clear()
+
+
+@cache_until_settings_change
 def get_debug():
     return get_settings_dict().get("debug") or False
 
 
+@cache_until_settings_change
+def get_cached_settings_dict():
+    return cast(SettingsDict, get_settings().to_dict())
+
+
 def get_settings_dict(settings: sublime.Settings | None = None):
-    return cast(SettingsDict, (settings or get_settings()).to_dict())
+    if settings is None:
+        return get_cached_settings_dict()
+    return cast(SettingsDict, settings.to_dict())
 
 
+@cache_until_settings_change
 def get_language_name_to_scopes():
     settings_d = get_settings_dict().get("language_name_to_scopes") or {}
     return {**LANGUAGE_NAME_TO_SCOPES, **settings_d}
 
 
+@cache_until_settings_change
 def get_language_name_to_debounce_ms():
     return get_settings_dict().get("language_name_to_debounce_ms") or {}
 
 
+@cache_until_settings_change
+def get_max_cached_trees() -> int | None:
+    return get_settings_dict().get("max_cached_trees")
+
+
+@cache_until_settings_change
 def get_scope_to_language_name():
     scope_to_language_name: dict[ScopeType, str] = {}
 
@@ -272,11 +315,13 @@ def get_scope_to_language_name():
     return scope_to_language_name
 
 
+@cache_until_settings_change
 def get_language_name_to_repo():
     settings_d = get_settings_dict().get("language_name_to_repo") or {}
     return {**LANGUAGE_NAME_TO_REPO, **settings_d}
 
 
+@cache_until_settings_change
 def get_language_name_to_parser_path():
     language_name_to_parser_path: dict[str, str] = {}
     language_name_to_repo = get_language_name_to_repo()
@@ -290,5 +335,6 @@ def get_language_name_to_parser_path():
     return language_name_to_parser_path
 
 
+@cache_until_settings_change
 def get_queries_path():
     return get_settings_dict().get("queries_path") or str(QUERIES_PATH)